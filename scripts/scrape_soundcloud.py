@@ -2,195 +2,549 @@
 """
 SoundCloud scraper for profiles and playlists
 Scrapes tracks without requiring a client_id
+
+The module is fully annotated so it can be compiled to a C extension by
+running `mypyc scrape_soundcloud.py` inside scripts/. The extension is only
+used when the module is imported (e.g. `python -c "import scrape_soundcloud;
+scrape_soundcloud.main()" <type> <url>`); running the .py file directly always
+uses the source. It also runs unchanged under PyPy:
+`pypy3 scripts/scrape_soundcloud.py <type> <url>`.
 """
+from __future__ import annotations
+
+import os
 import sys
+import gzip
 import json
 import re
+import atexit
+import asyncio
+import sqlite3
 import urllib.parse
+from contextlib import closing
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
 
-def scrape_profile(url):
-    """Scrape all tracks from a SoundCloud profile"""
+try:
+    import requests  # type: ignore[import-not-found, import-untyped]
+    from requests.adapters import HTTPAdapter  # type: ignore[import-not-found, import-untyped]
+except ImportError:  # Fall back to urllib when requests isn't installed
+    requests = None  # type: ignore[assignment, misc]
+
+try:
+    import brotli  # type: ignore[import-not-found, import-untyped]
+except ImportError:  # Only gzip is requested when brotli isn't installed
+    brotli = None  # type: ignore[assignment, misc]
+
+try:
+    from selectolax.lexbor import LexborHTMLParser  # type: ignore[import-not-found, import-untyped]
+except ImportError:  # Fall back to the regex patterns for anchors and list items
+    LexborHTMLParser = None  # type: ignore[assignment, misc]
+
+try:
+    import orjson  # type: ignore[import-not-found, import-untyped]
+except ImportError:  # Fall back to the stdlib json module
+    orjson = None  # type: ignore[assignment, misc]
+
+try:
+    from pybloom_live import ScalableBloomFilter  # type: ignore[import-not-found, import-untyped]
+except ImportError:  # Dedup always uses a set without pybloom_live
+    ScalableBloomFilter = None  # type: ignore[assignment, misc]
+
+try:
+    import aiohttp  # type: ignore[import-not-found, import-untyped]
+except ImportError:  # Batch mode falls back to threads without aiohttp
+    aiohttp = None  # type: ignore[assignment, misc]
+
+_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    # requests and aiohttp decode these transparently; urllib goes through _decompress
+    'Accept-Encoding': 'gzip, br' if brotli is not None else 'gzip'
+}
+_TIMEOUT = 30
+
+def _max_tracks_value(value: str) -> float:
+    """Parse a max_tracks setting: a whole number of at least 1, or 'inf' for no limit"""
+    if value.strip().lower() in ('inf', 'infinity'):
+        return float('inf')
+    max_tracks = int(value)
+    if max_tracks < 1:
+        raise ValueError(f'max_tracks must be at least 1: {value}')
+    # Always a float so the cache key is the same interpreted and under mypyc
+    return float(max_tracks)
+
+# Parsers stop once they have this many tracks. There is no limit by default;
+# set SC_MAX_TRACKS (or pass max_tracks) to cap large profiles and playlists.
+# A bad value falls back to no limit rather than breaking the JSON output.
+try:
+    _MAX_TRACKS = _max_tracks_value(os.environ.get('SC_MAX_TRACKS', 'inf'))
+except ValueError:
+    _MAX_TRACKS = float('inf')
+
+# Set SC_BLOOM_DEDUP=1 to drop tracks from a batch that an earlier URL in the
+# batch already returned. The seen URLs go in a Bloom filter when pybloom_live
+# is installed, so memory stays bounded on huge crawls at the cost of rare false
+# positives (a new track taken for a duplicate and dropped).
+_BLOOM_DEDUP = os.environ.get('SC_BLOOM_DEDUP', '').strip().lower() in ('1', 'true', 'yes')
+_BLOOM_CAPACITY = 100_000
+_BLOOM_ERROR_RATE = 1e-6
+
+Track = Dict[str, Optional[str]]
+ScrapeResult = Union[List[Track], Dict[str, str]]
+
+# Parsed tracks are cached per URL and revalidated with ETag / Last-Modified.
+# The cache lives in the user's own cache directory, never a shared temp dir.
+# Set SC_SCRAPE_CACHE to another file to move the cache, or to '' to disable it.
+_CACHE_PATH = os.environ.get('SC_SCRAPE_CACHE', os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'juketogether', 'soundcloud-scrape-cache.sqlite3'))
+# Bump whenever a parser change alters the tracks a page yields, so stale rows are ignored
+_CACHE_VERSION = 1
+_BATCH_CONCURRENCY = 64
+_BATCH_LIMIT_PER_HOST = 8
+
+# Patterns are compiled once at import time and reused by every scrape.
+_PROFILE_SUFFIXES = ('/tracks', '/popular-tracks', '/albums', '/sets', '/playlists', '/reposts')
+_USERNAME_ONLY = re.compile(r'soundcloud\.com/([^/]+)/?$')
+_USERNAME = re.compile(r'soundcloud\.com/([^/]+)')
+
+# Page patterns are bytes patterns: pages are scanned undecoded and only the
+# captured slices are decoded (see _text).
+# Each one gets its own pass over the page on purpose: they all start with a
+# literal ('href="', '<a', '<li') that re can jump between quickly, while a
+# combined alternation has to be tried at every offset and is several times slower.
+# Full or relative /username/track-name links, captured without any query string
+_TRACK_HREF = re.compile(rb'href="(?:https://soundcloud\.com)?/([^/"?#]+/[^/"?#]+)(?:[?#][^"]*)?"')
+_HREF_PAIR = re.compile(rb'href="/([^/]+)/([^/"]+)"')
+_HREF_ANY = re.compile(rb'href="/([^/]+)/([^"?#]+)')
+_SOUND_ITEM = re.compile(rb'<li[^>]*class="soundList__item"[^>]*>.*?aria-label="Track:\s*([^"]+)\s+by\s+([^"]+)"', re.DOTALL)
+_SOUND_ITEM_FULL = re.compile(rb'<li[^>]*class="soundList__item"[^>]*>.*?aria-label="Track:\s*([^"]+)\s+by\s+([^"]+)"[^>]*>.*?</li>', re.DOTALL)
+_COVER_ART = re.compile(rb'<a[^>]*class="[^"]*sound__coverArt[^"]*"[^>]*href="/([^/]+)/([^/"]+)"')
+_TRACK_STATION = re.compile(rb'<a[^>]*class="[^"]*trackItem__trackTitle[^"]*"[^>]*href="/([^/]+/[^?"#]+)')
+
+# Used on URLs and on attribute values pulled out by the HTML parser
+_ARIA_TRACK = re.compile(r'Track:\s*(.+)\s+by\s+(.+)', re.DOTALL)
+_SLUG_PAIR = re.compile(r'/([^/]+)/([^/]+)')
+_TRACK_PATH = re.compile(r'/([^/]+/[^?"#]+)')
+
+# The hydration blob holds the page's track data as JSON
+_HYDRATION = re.compile(rb'<script>window\.__sc_hydration\s*=\s*(\[.*?\]);</script>', re.DOTALL)
+
+# Opening tags of the <ul> that holds the tracks, so scans can skip the rest of the page
+_PROFILE_TRACK_LIST = re.compile(rb'<ul[^>]*class="[^"]*\bsoundList\b')
+_PLAYLIST_TRACK_LIST = re.compile(rb'<ul[^>]*class="[^"]*\b(?:trackList__list|systemPlaylistTrackList__list|soundList)\b')
+
+# Profile sub-pages that look like /username/<slug> but aren't tracks
+_BLOCKED_SLUGS = frozenset({'tracks', 'albums', 'sets', 'reposts', 'followers', 'following'})
+
+# Turns an aria-label track name into the slug SoundCloud uses in its URLs
+_NAME_TO_SLUG = str.maketrans({' ': '-', '(': None, ')': None, '.': None})
+# Turns a URL slug back into words for display
+_SLUG_TO_NAME = str.maketrans({'-': ' ', '_': ' '})
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+def _print_json(obj: Any) -> None:
+    """Print obj to stdout as indented JSON"""
+    if orjson is not None:
+        # orjson produces UTF-8 bytes; write them as-is so the console encoding doesn't matter
+        sys.stdout.buffer.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2) + b'\n')
+        sys.stdout.flush()
+    else:
+        print(json.dumps(obj, indent=2))
+
+# Shared keep-alive session so repeated scrapes reuse pooled connections
+_SESSION = None
+if requests is not None:
+    _SESSION = requests.Session()
+    _SESSION.headers.update(_HEADERS)
+    _SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=20))
+
+def close() -> None:
+    """Close the shared HTTP session"""
+    global _SESSION
+    if _SESSION is not None:
+        _SESSION.close()
+        _SESSION = None
+
+atexit.register(close)
+
+def _decompress(data: bytes, encoding: Optional[str]) -> bytes:
+    """Undo the Content-Encoding of a urllib response body"""
+    if encoding == 'gzip':
+        return gzip.decompress(data)
+    if encoding == 'br' and brotli is not None:
+        return brotli.decompress(data)
+    return data
+
+def _fetch(url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes, Any]:
+    """Fetch a page and return (status, raw HTML bytes, response headers)
+    
+    A 304 Not Modified reply is returned with an empty body instead of raising.
+    """
+    if _SESSION is not None:
+        response = _SESSION.get(url, headers=headers, timeout=_TIMEOUT)
+        if response.status_code == 304:
+            return 304, b'', response.headers
+        response.raise_for_status()
+        return response.status_code, response.content, response.headers
+    
+    req = Request(url, headers={**_HEADERS, **(headers or {})})
     try:
-        # Normalize URL - ensure it ends with /tracks for better results
-        # Handle various profile URL formats:
-        # - soundcloud.com/username
-        # - soundcloud.com/username/
-        # - soundcloud.com/username/tracks
-        # - soundcloud.com/username/popular-tracks
-        url = url.rstrip('/')
-        
-        # Check if URL already ends with a profile page indicator
-        profile_pages = ['/tracks', '/popular-tracks', '/albums', '/sets', '/playlists', '/reposts']
-        has_profile_page = any(url.endswith(page) for page in profile_pages)
-        
-        if not has_profile_page:
-            # If it's just a username, append /tracks
-            # Extract username from URL
-            username_match = re.search(r'soundcloud\.com/([^/]+)/?$', url)
-            if username_match:
-                url = url + '/tracks'
-            else:
-                # If URL has path segments, assume it needs /tracks
-                url = url + '/tracks'
-        
-        # Fetch the profile page
-        req = Request(url, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5'
-        })
-        
-        with urlopen(req, timeout=30) as response:
-            html = response.read().decode('utf-8', errors='ignore')
-        
-        tracks = []
-        seen_urls = set()
-        
+        with urlopen(req, timeout=_TIMEOUT) as response:
+            data = _decompress(response.read(), response.headers.get('Content-Encoding'))
+            return response.status, data, response.headers
+    except HTTPError as e:
+        if e.code == 304:
+            return 304, b'', e.headers
+        raise
+
+def _cache_connect() -> sqlite3.Connection:
+    """Open the scrape cache, creating its directory and table if needed"""
+    cache_dir = os.path.dirname(_CACHE_PATH)
+    if cache_dir:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    db = sqlite3.connect(_CACHE_PATH, timeout=5)
+    db.execute('CREATE TABLE IF NOT EXISTS scrape_cache (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, tracks TEXT)')
+    return db
+
+def _cache_get(url: str) -> Optional[Tuple[Optional[str], Optional[str], str]]:
+    """Return the cached (etag, last_modified, tracks JSON) row for a cache key, or None"""
+    if not _CACHE_PATH:
+        return None
+    try:
+        with closing(_cache_connect()) as db:
+            return db.execute('SELECT etag, last_modified, tracks FROM scrape_cache WHERE url = ?', (url,)).fetchone()
+    except (sqlite3.Error, OSError):
+        # The cache is only an optimization; never let it break a scrape
+        return None
+
+def _cache_put(url: str, etag: Optional[str], last_modified: Optional[str], tracks: List[Track]) -> None:
+    """Store the parsed tracks for url along with its validators"""
+    if not _CACHE_PATH or not (etag or last_modified):
+        return
+    try:
+        with closing(_cache_connect()) as db, db:
+            db.execute('INSERT OR REPLACE INTO scrape_cache VALUES (?, ?, ?, ?)',
+                       (url, etag, last_modified, json.dumps(tracks)))
+    except (sqlite3.Error, OSError):
+        pass
+
+def _scrape(url: str, parse: Callable[[bytes, str, float], ScrapeResult], max_tracks: float) -> ScrapeResult:
+    """Fetch url and parse it, reusing the cached tracks if the page hasn't changed"""
+    _check_max_tracks(max_tracks)
+    # The parser version, HTML backend and limit all change the parsed result,
+    # so they are part of the cache key
+    backend = 'lexbor' if LexborHTMLParser is not None else 're'
+    cache_key = f"v{_CACHE_VERSION} {backend} {url} {float(max_tracks)}"
+    cached = _cache_get(cache_key)
+    headers = {}
+    if cached:
+        etag, last_modified, _ = cached
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+    
+    status, html, response_headers = _fetch(url, headers)
+    if status == 304 and cached:
+        return _json_loads(cached[2])
+    
+    result = parse(html, url, max_tracks)
+    if isinstance(result, list):
+        _cache_put(cache_key, response_headers.get('ETag'), response_headers.get('Last-Modified'), result)
+    return result
+
+class _Dedup:
+    """Track URLs already seen, backed by a set or a scalable Bloom filter
+    
+    Parsers use a set per page. Pass one with bloom=True to scrape_many to
+    dedupe across a whole batch; it falls back to a set without pybloom_live.
+    """
+    
+    def __init__(self, bloom: bool = False) -> None:
+        if bloom and ScalableBloomFilter is not None:
+            self._seen: Any = ScalableBloomFilter(initial_capacity=_BLOOM_CAPACITY, error_rate=_BLOOM_ERROR_RATE)
+        else:
+            self._seen = set()
+    
+    def add(self, url: str) -> bool:
+        """Record url, returning True if it hadn't been seen before"""
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        return True
+
+def _check_max_tracks(max_tracks: float) -> None:
+    """Reject limits that would silently drop tracks or turn a result into []"""
+    if not max_tracks >= 1:
+        raise ValueError(f'max_tracks must be at least 1: {max_tracks}')
+
+def _limit(tracks: List[Track], max_tracks: float) -> List[Track]:
+    """Trim tracks to at most max_tracks entries"""
+    return tracks if len(tracks) <= max_tracks else tracks[:int(max_tracks)]
+
+def _text(value: bytes) -> str:
+    """Decode a slice captured from the raw page"""
+    return value.decode('utf-8', errors='ignore')
+
+def _text_pairs(pairs: List[Tuple[bytes, bytes]]) -> List[Tuple[str, str]]:
+    """Decode the two captured groups of each findall() result"""
+    return [(_text(first), _text(second)) for first, second in pairs]
+
+def _track_list_region(html: bytes, list_pattern: re.Pattern[bytes]) -> bytes:
+    """Return the track list <ul> from the page, or the whole page if it can't be found"""
+    list_match = list_pattern.search(html)
+    if not list_match:
+        return html
+    
+    # Walk nested lists to find the </ul> that closes this one
+    start = list_match.start()
+    pos = start + 3
+    depth = 1
+    while depth:
+        close = html.find(b'</ul>', pos)
+        if close == -1:
+            return html
+        nested = html.find(b'<ul', pos, close)
+        if nested != -1:
+            depth += 1
+            pos = nested + 3
+        else:
+            depth -= 1
+            pos = close + 5
+    
+    return html[start:pos]
+
+def _parse_tree(html: bytes) -> Any:
+    """Parse html into a DOM tree, or return None when selectolax isn't installed"""
+    return LexborHTMLParser(html) if LexborHTMLParser is not None else None
+
+def _node_slug_pairs(nodes: List[Any]) -> List[Tuple[str, str]]:
+    """Return (artist slug, track slug) for each node whose href is /artist/track"""
+    pairs = []
+    for node in nodes:
+        href_match = _SLUG_PAIR.fullmatch(node.attributes.get('href') or '')
+        if href_match:
+            pairs.append((href_match.group(1), href_match.group(2)))
+    return pairs
+
+def _sound_item_labels(tree: Any) -> Iterator[Tuple[Any, str, str]]:
+    """Yield (li node, track name, artist name) for each sound list item in a parsed page"""
+    for item in tree.css('li.soundList__item'):
+        label = item.css_first('[aria-label^="Track:"]')
+        if label is None:
+            continue
+        label_match = _ARIA_TRACK.match(label.attributes.get('aria-label') or '')
+        if label_match:
+            yield item, label_match.group(1), label_match.group(2)
+
+def _profile_sound_items(html: bytes, tree: Any) -> Iterator[Tuple[str, str, List[Tuple[str, str]]]]:
+    """Yield (track name, artist name, nearby href slug pairs) for each sound list item"""
+    if tree is not None:
+        for item, track_name, artist_name in _sound_item_labels(tree):
+            yield track_name, artist_name, _node_slug_pairs(item.css('a[href]'))
+        return
+    
+    for sound_item in _SOUND_ITEM.finditer(html):
+        # The match already knows where the aria-label is, so only search inside it
+        aria_pos = html.rfind(b'aria-label=', sound_item.start(), sound_item.start(1))
+        if aria_pos != -1:
+            # Look in a 2000 character window around the aria-label
+            context_start = max(0, aria_pos - 1000)
+            context_end = min(len(html), aria_pos + 1000)
+            context = html[context_start:context_end]
+            yield _text(sound_item.group(1)), _text(sound_item.group(2)), _text_pairs(_HREF_PAIR.findall(context))
+
+def _sound_item_names(html: bytes, tree: Any) -> List[Tuple[str, str]]:
+    """Return (track name, artist name) for each sound list item"""
+    if tree is not None:
+        return [(track_name, artist_name) for _, track_name, artist_name in _sound_item_labels(tree)]
+    return _text_pairs(_SOUND_ITEM_FULL.findall(html))
+
+def _cover_art_links(html: bytes, tree: Any) -> List[Tuple[str, str]]:
+    """Return (artist slug, track slug) for each sound__coverArt link"""
+    if tree is not None:
+        return _node_slug_pairs(tree.css('a.sound__coverArt[href]'))
+    return _text_pairs(_COVER_ART.findall(html))
+
+def _track_title_links(html: bytes, tree: Any) -> List[str]:
+    """Return the artist/track path of each trackItem__trackTitle link"""
+    if tree is not None:
+        paths = []
+        for node in tree.css('a.trackItem__trackTitle[href]'):
+            path_match = _TRACK_PATH.match(node.attributes.get('href') or '')
+            if path_match:
+                paths.append(path_match.group(1))
+        return paths
+    return [_text(path) for path in _TRACK_STATION.findall(html)]
+
+def _profile_url(url: str) -> str:
+    """Normalize a profile URL so it points at a tracks page"""
+    # Normalize URL - ensure it ends with /tracks for better results
+    # Handle various profile URL formats:
+    # - soundcloud.com/username
+    # - soundcloud.com/username/
+    # - soundcloud.com/username/tracks
+    # - soundcloud.com/username/popular-tracks
+    url = url.rstrip('/')
+    
+    # Check if URL already ends with a profile page indicator
+    has_profile_page = url.endswith(_PROFILE_SUFFIXES)
+    
+    if not has_profile_page:
+        # If it's just a username, append /tracks
         # Extract username from URL
-        username_match = re.search(r'soundcloud\.com/([^/]+)', url)
-        username = username_match.group(1) if username_match else None
-        
-        # Method 1: Find track links in href attributes
-        # Pattern: href="/username/track-name" or href="https://soundcloud.com/username/track-name"
-        track_patterns = [
-            r'href="(https://soundcloud\.com/[^/]+/[^/"]+)"',  # Full URLs
-            r'href="/([^/]+/[^/"]+)"',  # Relative URLs
-        ]
-        
-        for pattern in track_patterns:
-            matches = re.findall(pattern, html)
-            for match in matches:
-                # Build full URL if it's relative
-                if not match.startswith('http'):
-                    track_url = f"https://soundcloud.com/{match}"
-                else:
-                    track_url = match
-                
-                # Skip if it's a playlist, set, or other non-track URL
-                if '/sets/' in track_url or '/playlists/' in track_url or '/reposts' in track_url:
-                    continue
-                
-                # Check if it's a track (username/track-name format)
-                url_parts = track_url.replace('https://soundcloud.com/', '').split('/')
-                if len(url_parts) == 2 and url_parts[0] and url_parts[1]:
-                    # It's a track URL
-                    if track_url not in seen_urls:
-                        seen_urls.add(track_url)
-                        track_name = url_parts[1]
-                        # Clean up track name for display
-                        display_name = track_name.replace('-', ' ').replace('_', ' ').title()
-                        
-                        tracks.append({
-                            'url': track_url,
-                            'title': display_name,
-                            'artist': username.replace('-', ' ').title() if username else None,
-                            'fullTitle': f"{username.replace('-', ' ').title()} - {display_name}" if username else display_name,
-                            'thumbnail': None
-                        })
+        username_match = _USERNAME_ONLY.search(url)
+        if username_match:
+            url = url + '/tracks'
+        else:
+            # If URL has path segments, assume it needs /tracks
+            url = url + '/tracks'
+    
+    return url
+
+def _parse_profile(html: bytes, url: str, max_tracks: float = _MAX_TRACKS) -> ScrapeResult:
+    """Extract tracks from the HTML of a profile page"""
+    _check_max_tracks(max_tracks)
+    # Start from the hydration data when the page has it, and skip the
+    # HTML methods unless it left stub tracks for them to fill in
+    dedup = _Dedup()
+    tracks, complete = _tracks_from_hydration(html, dedup)
+    if tracks and (complete or len(tracks) >= max_tracks):
+        return _limit(tracks, max_tracks)
+    
+    html = _track_list_region(html, _PROFILE_TRACK_LIST)
+    
+    # Extract username from URL
+    username_match = _USERNAME.search(url)
+    username = username_match.group(1) if username_match else None
+    artist_display = username.translate(_SLUG_TO_NAME).title() if username else None
+    
+    # Method 1: Find track links in href attributes
+    # Pattern: href="/username/track-name" or href="https://soundcloud.com/username/track-name"
+    for path in map(_text, _TRACK_HREF.findall(html)):
+        track_url = f"https://soundcloud.com/{path}"
         
-        # Method 2: Extract track information from sound list items (most reliable)
-        # Look for sound list items with aria-label containing track info
-        # Pattern: <li class="soundList__item">...aria-label="Track: track-name by Artist"
-        sound_item_pattern = r'<li[^>]*class="soundList__item"[^>]*>.*?aria-label="Track:\s*([^"]+)\s+by\s+([^"]+)"'
-        sound_items = re.findall(sound_item_pattern, html, re.DOTALL)
+        # Skip reposts and other non-track URLs
+        if '/reposts' in track_url:
+            continue
         
-        for track_name, artist_name in sound_items:
-            # Find the corresponding href link for this track
-            # Look for href="/username/track-slug" pattern
-            # The track slug is usually derived from the track name
-            track_name_clean = track_name.strip()
+        if dedup.add(track_url):
+            track_name = path.split('/')[1]
+            # Clean up track name for display
+            display_name = track_name.translate(_SLUG_TO_NAME).title()
             
-            # Try to find the href link near this aria-label
-            # Search in a window around where we found the aria-label
-            aria_pos = html.find(f'aria-label="Track: {track_name}')
-            if aria_pos != -1:
-                # Look in a 2000 character window around the aria-label
-                context_start = max(0, aria_pos - 1000)
-                context_end = min(len(html), aria_pos + 1000)
-                context = html[context_start:context_end]
-                
-                # Find href="/username/track-slug" in this context
-                href_pattern = r'href="/([^/]+)/([^/"]+)"'
-                href_matches = re.findall(href_pattern, context)
-                
-                for artist_slug, track_slug in href_matches:
-                    # Skip if it's a playlist or other non-track URL
-                    if '/sets/' in track_slug or '/playlists/' in track_slug or track_slug in ['tracks', 'albums', 'sets', 'reposts', 'followers', 'following']:
-                        continue
-                    
-                    track_url = f"https://soundcloud.com/{artist_slug}/{track_slug}"
-                    
-                    if track_url not in seen_urls:
-                        seen_urls.add(track_url)
-                        # Check if we already have this track
-                        existing = next((t for t in tracks if t['url'] == track_url), None)
-                        if not existing:
-                            tracks.append({
-                                'url': track_url,
-                                'title': track_name_clean,
-                                'artist': artist_name.strip(),
-                                'fullTitle': f"{artist_name.strip()} - {track_name_clean}",
-                                'thumbnail': None
-                            })
-                        break  # Found the track URL, move to next track
-        
-        # Method 3: Extract from sound__coverArt links (direct approach)
-        # Pattern: <a class="sound__coverArt" href="/username/track-slug">
-        cover_art_pattern = r'<a[^>]*class="[^"]*sound__coverArt[^"]*"[^>]*href="/([^/]+)/([^/"]+)"'
-        cover_art_matches = re.findall(cover_art_pattern, html)
+            tracks.append({
+                'url': track_url,
+                'title': display_name,
+                'artist': artist_display,
+                'fullTitle': f"{artist_display} - {display_name}" if artist_display else display_name,
+                'thumbnail': None
+            })
+    
+    # Skip the remaining methods once there are enough tracks
+    if len(tracks) >= max_tracks:
+        return _limit(tracks, max_tracks)
+    
+    # The DOM methods below are the first to need the tree, so only build it now
+    tree = _parse_tree(html)
+    
+    # Method 2: Extract track information from sound list items (most reliable)
+    # Look for sound list items with aria-label containing track info
+    # Pattern: <li class="soundList__item">...aria-label="Track: track-name by Artist"
+    for track_name, artist_name, href_matches in _profile_sound_items(html, tree):
+        # Find the corresponding href link for this track
+        # Look for href="/username/track-slug" pattern
+        # The track slug is usually derived from the track name
+        track_name_clean = track_name.strip()
+        artist_name_clean = artist_name.strip()
+        full_title = f"{artist_name_clean} - {track_name_clean}"
         
-        for artist_slug, track_slug in cover_art_matches:
+        for artist_slug, track_slug in href_matches:
             # Skip if it's a playlist or other non-track URL
-            if '/sets/' in track_slug or '/playlists/' in track_slug or track_slug in ['tracks', 'albums', 'sets', 'reposts', 'followers', 'following']:
+            if track_slug in _BLOCKED_SLUGS:
                 continue
             
             track_url = f"https://soundcloud.com/{artist_slug}/{track_slug}"
             
-            if track_url not in seen_urls:
-                seen_urls.add(track_url)
-                # Try to find the track name from aria-label or title
-                track_name = track_slug.replace('-', ' ').replace('_', ' ').title()
-                artist_name = artist_slug.replace('-', ' ').title()
-                
-                # Check if we already have this track
-                existing = next((t for t in tracks if t['url'] == track_url), None)
-                if not existing:
-                    tracks.append({
-                        'url': track_url,
-                        'title': track_name,
-                        'artist': artist_name,
-                        'fullTitle': f"{artist_name} - {track_name}",
-                        'thumbnail': None
-                    })
+            if dedup.add(track_url):
+                tracks.append({
+                    'url': track_url,
+                    'title': track_name_clean,
+                    'artist': artist_name_clean,
+                    'fullTitle': full_title,
+                    'thumbnail': None
+                })
+                break  # Found the track URL, move to next track
+    
+    # Skip the remaining methods once there are enough tracks
+    if len(tracks) >= max_tracks:
+        return _limit(tracks, max_tracks)
+    
+    # Method 3: Extract from sound__coverArt links (direct approach)
+    # Pattern: <a class="sound__coverArt" href="/username/track-slug">
+    cover_art_matches = _cover_art_links(html, tree)
+    
+    for artist_slug, track_slug in cover_art_matches:
+        # Skip if it's a playlist or other non-track URL
+        if track_slug in _BLOCKED_SLUGS:
+            continue
+        
+        track_url = f"https://soundcloud.com/{artist_slug}/{track_slug}"
         
-        # Remove duplicates based on URL
-        unique_tracks = []
-        seen = set()
-        for track in tracks:
-            if track['url'] not in seen:
-                seen.add(track['url'])
-                unique_tracks.append(track)
+        if dedup.add(track_url):
+            # Try to find the track name from aria-label or title
+            track_name = track_slug.translate(_SLUG_TO_NAME).title()
+            artist_name = artist_slug.translate(_SLUG_TO_NAME).title()
+            
+            tracks.append({
+                'url': track_url,
+                'title': track_name,
+                'artist': artist_name,
+                'fullTitle': f"{artist_name} - {track_name}",
+                'thumbnail': None
+            })
+    
+    return _limit(tracks, max_tracks) if tracks else {'error': 'No tracks found'}
+
+def scrape_profile(url: str, max_tracks: float = _MAX_TRACKS) -> ScrapeResult:
+    """Scrape all tracks from a SoundCloud profile"""
+    try:
+        url = _profile_url(url)
         
-        return unique_tracks if unique_tracks else {'error': 'No tracks found'}
+        # Fetch and parse the profile page
+        return _scrape(url, _parse_profile, max_tracks)
         
     except Exception as e:
         return {'error': str(e)}
 
-def extract_tracks_from_hydration(data):
+def extract_tracks_from_hydration(data: Any) -> List[Track]:
     """Extract tracks from SoundCloud hydration data"""
+    return _walk_hydration(data, _Dedup())[0]
+
+def _walk_hydration(data: Any, dedup: _Dedup) -> Tuple[List[Track], bool]:
+    """Return the tracks in hydration data and whether it also held stub tracks
+    
+    Playlists only hydrate their first few tracks; the rest are stubs like
+    {"kind": "track", "id": N} with no URL, which only the page's HTML links to.
+    """
     tracks = []
+    has_stubs = False
     
-    def search_dict(obj, depth=0):
-        if depth > 10:  # Prevent infinite recursion
-            return
+    # Walk the data depth-first with an explicit stack, in document order
+    stack = [data]
+    while stack:
+        obj = stack.pop()
         
         if isinstance(obj, dict):
-            # Look for track-like objects
-            if 'permalink_url' in obj or 'uri' in obj:
+            # Look for track-like objects (users and playlists carry permalink_url too)
+            if ('permalink_url' in obj or 'uri' in obj) and obj.get('kind', 'track') == 'track':
                 url = obj.get('permalink_url') or obj.get('uri', '')
-                if url and 'soundcloud.com' in url and '/sets/' not in url and '/playlists/' not in url:
+                if url and 'soundcloud.com' in url and '/sets/' not in url and '/playlists/' not in url and dedup.add(url):
                     title = obj.get('title', 'Unknown Track')
                     user = obj.get('user', {})
                     artist = user.get('username', '') if user else None
@@ -202,155 +556,232 @@ def extract_tracks_from_hydration(data):
                         'fullTitle': f"{artist} - {title}" if artist else title,
                         'thumbnail': obj.get('artwork_url') or (user.get('avatar_url') if user else None)
                     })
+            elif obj.get('kind') == 'track':
+                has_stubs = True
             
-            # Recursively search nested objects
-            for value in obj.values():
-                search_dict(value, depth + 1)
+            # Search nested objects, reversed so they pop in their original order
+            stack.extend(reversed(list(obj.values())))
         elif isinstance(obj, list):
-            for item in obj:
-                search_dict(item, depth + 1)
+            stack.extend(reversed(obj))
     
-    search_dict(data)
-    return tracks
+    return tracks, has_stubs
 
-def scrape_playlist(url):
-    """Scrape all tracks from a SoundCloud playlist"""
+def _tracks_from_hydration(html: bytes, dedup: _Dedup) -> Tuple[List[Track], bool]:
+    """Extract tracks from the page's __sc_hydration blob, if it has one
+    
+    Returns the tracks and whether the blob is complete, i.e. it holds no stub
+    tracks that the HTML methods still need to fill in.
+    """
+    hydration_match = _HYDRATION.search(html)
+    if not hydration_match:
+        return [], False
+    
     try:
-        # Fetch the playlist page
-        req = Request(url, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5'
-        })
-        
-        with urlopen(req, timeout=30) as response:
-            html = response.read().decode('utf-8', errors='ignore')
-        
-        tracks = []
-        seen_urls = set()
-        
-        # Extract playlist owner from URL
-        owner_match = re.search(r'soundcloud\.com/([^/]+)', url)
-        owner = owner_match.group(1) if owner_match else None
-        
-        # Method 0: Extract tracks from track station pages (systemPlaylistTrackList)
-        # Track stations have a specific structure with systemPlaylistTrackList__item
-        # Also works for regular playlists that use trackItem__trackTitle
-        track_station_pattern = r'<a[^>]*class="[^"]*trackItem__trackTitle[^"]*"[^>]*href="/([^/]+/[^?"#]+)'
-        track_station_matches = re.findall(track_station_pattern, html)
-        for match in track_station_matches:
-            # Remove query parameters
-            clean_match = match.split('?')[0]
-            track_url = f"https://soundcloud.com/{clean_match}"
-            if track_url not in seen_urls and '/sets/' not in track_url and '/playlists/' not in track_url:
-                seen_urls.add(track_url)
-                url_parts = clean_match.split('/')
-                if len(url_parts) == 2 and url_parts[0] and url_parts[1]:
-                    track_name = url_parts[1]
-                    display_name = track_name.replace('-', ' ').replace('_', ' ').title()
-                    artist_name = url_parts[0].replace('-', ' ').title()
-                    tracks.append({
-                        'url': track_url,
-                        'title': display_name,
-                        'artist': artist_name,
-                        'fullTitle': f"{artist_name} - {display_name}",
-                        'thumbnail': None
-                    })
-        
-        # Method 1: Extract track information from sound list items (best method)
-        # Look for sound list items with aria-label containing track info
-        sound_item_pattern = r'<li[^>]*class="soundList__item"[^>]*>.*?aria-label="Track:\s*([^"]+)\s+by\s+([^"]+)"[^>]*>.*?</li>'
-        sound_items = re.findall(sound_item_pattern, html, re.DOTALL)
-        
-        for track_name, artist_name in sound_items:
-            # Find the href within this sound item
-            track_name_slug = track_name.lower().replace(' ', '-').replace('(', '').replace(')', '').replace('.', '').replace('mp3', '')
-            # Try to find href with this track
-            href_pattern = rf'href="/([^/]+)/([^"]*{re.escape(track_name_slug[:30])}[^"]*)"'
-            href_match = re.search(href_pattern, html, re.IGNORECASE)
-            if href_match:
-                artist_slug = href_match.group(1)
-                track_slug = href_match.group(2)
-                track_url = f"https://soundcloud.com/{artist_slug}/{track_slug}"
-                
-                if track_url not in seen_urls and '/sets/' not in track_url and '/playlists/' not in track_url:
-                    seen_urls.add(track_url)
-                    tracks.append({
-                        'url': track_url,
-                        'title': track_name.strip(),
-                        'artist': artist_name.strip(),
-                        'fullTitle': f"{artist_name.strip()} - {track_name.strip()}",
-                        'thumbnail': None
-                    })
-        
-        # Method 2: Find track links in href attributes (fallback)
-        track_patterns = [
-            r'href="(https://soundcloud\.com/[^/]+/[^/"]+)"',  # Full URLs
-            r'href="/([^/]+/[^/"]+)"',  # Relative URLs
-        ]
+        data = _json_loads(hydration_match.group(1))
+    except ValueError:
+        return [], False
+    
+    tracks, has_stubs = _walk_hydration(data, dedup)
+    return tracks, not has_stubs
+
+def _parse_playlist(html: bytes, url: str, max_tracks: float = _MAX_TRACKS) -> ScrapeResult:
+    """Extract tracks from the HTML of a playlist page"""
+    _check_max_tracks(max_tracks)
+    # Start from the hydration data when the page has it, and skip the
+    # HTML methods unless it left stub tracks for them to fill in
+    dedup = _Dedup()
+    tracks, complete = _tracks_from_hydration(html, dedup)
+    if tracks and (complete or len(tracks) >= max_tracks):
+        return _limit(tracks, max_tracks)
+    
+    html = _track_list_region(html, _PLAYLIST_TRACK_LIST)
+    # Every method from here on reads the tree when selectolax is installed
+    tree = _parse_tree(html)
+    
+    # Extract playlist owner from URL
+    owner_match = _USERNAME.search(url)
+    owner = owner_match.group(1) if owner_match else None
+    
+    # Method 0: Extract tracks from track station pages (systemPlaylistTrackList)
+    # Track stations have a specific structure with systemPlaylistTrackList__item
+    # Also works for regular playlists that use trackItem__trackTitle
+    track_station_matches = _track_title_links(html, tree)
+    for match in track_station_matches:
+        # Remove query parameters
+        clean_match = match.split('?')[0]
+        track_url = f"https://soundcloud.com/{clean_match}"
+        if '/sets/' not in track_url and '/playlists/' not in track_url and dedup.add(track_url):
+            url_parts = clean_match.split('/')
+            if len(url_parts) == 2 and url_parts[0] and url_parts[1]:
+                track_name = url_parts[1]
+                display_name = track_name.translate(_SLUG_TO_NAME).title()
+                artist_name = url_parts[0].translate(_SLUG_TO_NAME).title()
+                tracks.append({
+                    'url': track_url,
+                    'title': display_name,
+                    'artist': artist_name,
+                    'fullTitle': f"{artist_name} - {display_name}",
+                    'thumbnail': None
+                })
+    
+    # Skip the remaining methods once there are enough tracks
+    if len(tracks) >= max_tracks:
+        return _limit(tracks, max_tracks)
+    
+    # Method 1: Extract track information from sound list items (best method)
+    # Look for sound list items with aria-label containing track info
+    sound_items = _sound_item_names(html, tree)
+    
+    # Index every href once so each sound item is a dict lookup instead of a full rescan
+    slug_map: Dict[str, Tuple[str, str]] = {}
+    if sound_items:
+        for artist_slug, track_slug in _text_pairs(_HREF_ANY.findall(html)):
+            slug_map.setdefault(track_slug.lower(), (artist_slug, track_slug))
+    
+    for track_name, artist_name in sound_items:
+        # Find the href within this sound item
+        track_name_slug = track_name.lower().translate(_NAME_TO_SLUG).replace('mp3', '')
+        # Try the exact slug first, then any href containing its prefix
+        href_match = slug_map.get(track_name_slug)
+        if href_match is None:
+            prefix = track_name_slug[:30]
+            href_match = next((v for k, v in slug_map.items() if prefix in k), None)
+        if href_match:
+            artist_slug, track_slug = href_match
+            track_url = f"https://soundcloud.com/{artist_slug}/{track_slug}"
+            
+            if '/sets/' not in track_url and '/playlists/' not in track_url and dedup.add(track_url):
+                track_name = track_name.strip()
+                artist_name = artist_name.strip()
+                tracks.append({
+                    'url': track_url,
+                    'title': track_name,
+                    'artist': artist_name,
+                    'fullTitle': f"{artist_name} - {track_name}",
+                    'thumbnail': None
+                })
+    
+    # Skip the remaining methods once there are enough tracks
+    if len(tracks) >= max_tracks:
+        return _limit(tracks, max_tracks)
+    
+    # Method 2: Find track links in href attributes (fallback)
+    for path in map(_text, _TRACK_HREF.findall(html)):
+        track_url = f"https://soundcloud.com/{path}"
         
-        for pattern in track_patterns:
-            matches = re.findall(pattern, html)
-            for match in matches:
-                # Build full URL if it's relative
-                if not match.startswith('http'):
-                    # Remove query parameters from relative URLs (e.g., ?in_system_playlist=...)
-                    clean_match = match.split('?')[0]
-                    track_url = f"https://soundcloud.com/{clean_match}"
-                else:
-                    # Remove query parameters from full URLs
-                    track_url = match.split('?')[0]
-                
-                # Skip if it's a playlist, set, or other non-track URL
-                if '/sets/' in track_url or '/playlists/' in track_url:
-                    continue
-                
-                # Check if it's a track (username/track-name format)
-                url_parts = track_url.replace('https://soundcloud.com/', '').split('/')
-                if len(url_parts) == 2 and url_parts[0] and url_parts[1]:
-                    if track_url not in seen_urls:
-                        seen_urls.add(track_url)
-                        track_name = url_parts[1]
-                        display_name = track_name.replace('-', ' ').replace('_', ' ').title()
-                        artist_name = url_parts[0].replace('-', ' ').title()
-                        
-                        tracks.append({
-                            'url': track_url,
-                            'title': display_name,
-                            'artist': artist_name,
-                            'fullTitle': f"{artist_name} - {display_name}",
-                            'thumbnail': None
-                        })
+        if dedup.add(track_url):
+            artist_slug, track_name = path.split('/')
+            display_name = track_name.translate(_SLUG_TO_NAME).title()
+            artist_name = artist_slug.translate(_SLUG_TO_NAME).title()
+            
+            tracks.append({
+                'url': track_url,
+                'title': display_name,
+                'artist': artist_name,
+                'fullTitle': f"{artist_name} - {display_name}",
+                'thumbnail': None
+            })
+    
+    return _limit(tracks, max_tracks) if tracks else {'error': 'No tracks found'}
+
+def scrape_playlist(url: str, max_tracks: float = _MAX_TRACKS) -> ScrapeResult:
+    """Scrape all tracks from a SoundCloud playlist"""
+    try:
+        # Fetch and parse the playlist page
+        return _scrape(url, _parse_playlist, max_tracks)
         
-        # Remove duplicates
-        unique_tracks = []
-        seen = set()
-        for track in tracks:
-            if track['url'] not in seen:
-                seen.add(track['url'])
-                unique_tracks.append(track)
+    except Exception as e:
+        return {'error': str(e)}
+
+async def _fetch_async(session: Any, url: str) -> bytes:
+    """Fetch a page with an aiohttp session and return its raw HTML bytes"""
+    async with session.get(url) as response:
+        response.raise_for_status()
+        return await response.read()
+
+async def scrape_profile_async(session: Any, url: str, max_tracks: float = _MAX_TRACKS) -> ScrapeResult:
+    """Scrape all tracks from a SoundCloud profile using an aiohttp session"""
+    try:
+        url = _profile_url(url)
+        html = await _fetch_async(session, url)
+        return _parse_profile(html, url, max_tracks)
         
-        return unique_tracks if unique_tracks else {'error': 'No tracks found'}
+    except Exception as e:
+        return {'error': str(e)}
+
+async def scrape_playlist_async(session: Any, url: str, max_tracks: float = _MAX_TRACKS) -> ScrapeResult:
+    """Scrape all tracks from a SoundCloud playlist using an aiohttp session"""
+    try:
+        html = await _fetch_async(session, url)
+        return _parse_playlist(html, url, max_tracks)
         
     except Exception as e:
         return {'error': str(e)}
 
-def main():
+async def scrape_many(urls: List[str], scrape_type: str = 'profile', concurrency: int = _BATCH_CONCURRENCY,
+                      max_tracks: float = _MAX_TRACKS, dedup: Optional[_Dedup] = None) -> List[ScrapeResult]:
+    """Scrape many profiles or playlists concurrently, returning results in input order
+    
+    With dedup, a track is only kept for the first URL (in input order) that returns it.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    
+    async def _wrap(coro: Any) -> ScrapeResult:
+        async with sem:
+            return await coro
+    
+    if aiohttp is None:
+        # No aiohttp: run the sync scrapers on worker threads instead
+        scrape = scrape_playlist if scrape_type == 'playlist' else scrape_profile
+        results = await asyncio.gather(*[_wrap(asyncio.to_thread(scrape, url, max_tracks)) for url in urls])
+    else:
+        scrape_async = scrape_playlist_async if scrape_type == 'playlist' else scrape_profile_async
+        connector = aiohttp.TCPConnector(limit_per_host=_BATCH_LIMIT_PER_HOST)
+        timeout = aiohttp.ClientTimeout(total=_TIMEOUT)
+        async with aiohttp.ClientSession(headers=_HEADERS, connector=connector, timeout=timeout) as session:
+            results = await asyncio.gather(*[_wrap(scrape_async(session, url, max_tracks)) for url in urls])
+    
+    if dedup is None:
+        return results
+    # Dedupe after gathering so the URL that keeps a shared track doesn't depend on timing
+    return [[track for track in result if dedup.add(str(track['url']))] if isinstance(result, list) else result
+            for result in results]
+
+def main() -> None:
     if len(sys.argv) < 3:
-        print(json.dumps({'error': 'Usage: python scrape_soundcloud.py <type> <url>'}))
+        _print_json({'error': 'Usage: python scrape_soundcloud.py <type> <url> [max_tracks] | batch <type> [max_tracks] < urls.txt'})
         sys.exit(1)
     
     scrape_type = sys.argv[1]
     url = sys.argv[2]
+    result: Any
+    
+    try:
+        max_tracks = _max_tracks_value(sys.argv[3]) if len(sys.argv) > 3 else _MAX_TRACKS
+    except ValueError:
+        _print_json({'error': f'Invalid max_tracks: {sys.argv[3]}'})
+        sys.exit(1)
     
-    if scrape_type == 'profile':
-        result = scrape_profile(url)
+    if scrape_type == 'batch':
+        # Batch mode: scrape every URL read from stdin (one per line)
+        batch_type = url
+        if batch_type not in ('profile', 'playlist'):
+            result = {'error': f'Unknown type: {batch_type}'}
+        else:
+            # Results are keyed by URL, so scrape each one once; with dedup a repeat
+            # would otherwise come back empty and overwrite the first result
+            urls = list(dict.fromkeys(line.strip() for line in sys.stdin if line.strip()))
+            dedup = _Dedup(bloom=True) if _BLOOM_DEDUP else None
+            results = asyncio.run(scrape_many(urls, batch_type, max_tracks=max_tracks, dedup=dedup))
+            result = dict(zip(urls, results))
+    elif scrape_type == 'profile':
+        result = scrape_profile(url, max_tracks)
     elif scrape_type == 'playlist':
-        result = scrape_playlist(url)
+        result = scrape_playlist(url, max_tracks)
     else:
         result = {'error': f'Unknown type: {scrape_type}'}
     
-    print(json.dumps(result, indent=2))
+    _print_json(result)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Tests for the SoundCloud scraper's page parsers
+Run with: python -m unittest discover scripts
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import scrape_soundcloud
+
+def _track(slug, title):
+    return {
+        'kind': 'track',
+        'permalink_url': f'https://soundcloud.com/bob/{slug}',
+        'title': title,
+        'user': {'username': 'Bob'}
+    }
+
+# A playlist whose hydration blob only has the first two tracks in full; the
+# other two are stubs that only the track list HTML links to
+STUB_PLAYLIST = (
+    '<html><script>window.__sc_hydration = ' + json.dumps([{
+        'hydratable': 'playlist',
+        'data': {
+            'kind': 'playlist',
+            'permalink_url': 'https://soundcloud.com/bob/sets/mix',
+            'tracks': [_track('t1', 'T1'), _track('t2', 'T2'), {'kind': 'track', 'id': 3}, {'kind': 'track', 'id': 4}]
+        }
+    }]) + ';</script>'
+    '<ul class="trackList__list">'
+    + ''.join(f'<li><a class="trackItem__trackTitle" href="/bob/t{n}">T{n}</a></li>' for n in range(1, 5))
+    + '</ul></html>'
+).encode()
+
+class HydrationStubTest(unittest.TestCase):
+    def test_playlist_fills_in_stub_tracks_from_html(self):
+        tracks = scrape_soundcloud._parse_playlist(STUB_PLAYLIST, 'https://soundcloud.com/bob/sets/mix')
+        self.assertEqual([track['url'] for track in tracks],
+                         [f'https://soundcloud.com/bob/t{n}' for n in range(1, 5)])
+        # The hydrated tracks keep their full metadata
+        self.assertEqual(tracks[0]['fullTitle'], 'Bob - T1')
+
+    def test_complete_hydration_skips_html(self):
+        html = STUB_PLAYLIST.replace(b', {"kind": "track", "id": 3}, {"kind": "track", "id": 4}', b'')
+        tracks = scrape_soundcloud._parse_playlist(html, 'https://soundcloud.com/bob/sets/mix')
+        self.assertEqual([track['url'] for track in tracks],
+                         ['https://soundcloud.com/bob/t1', 'https://soundcloud.com/bob/t2'])
+
+class TrackListRegionTest(unittest.TestCase):
+    pattern = scrape_soundcloud._PLAYLIST_TRACK_LIST
+
+    def test_nested_list_is_kept_whole(self):
+        track_list = b'<ul class="trackList__list"><li><ul><li>a</li></ul></li><li>b</li></ul>'
+        html = b'<header></header>' + track_list + b'<footer></footer>'
+        self.assertEqual(scrape_soundcloud._track_list_region(html, self.pattern), track_list)
+
+    def test_links_after_the_list_are_excluded(self):
+        html = (b'<a href="/bob/before">x</a><ul class="trackList__list"><li><a href="/bob/t1">T1</a></li></ul>'
+                b'<a href="/bob/after">y</a>')
+        region = scrape_soundcloud._track_list_region(html, self.pattern)
+        self.assertIn(b'/bob/t1', region)
+        self.assertNotIn(b'/bob/before', region)
+        self.assertNotIn(b'/bob/after', region)
+
+    def test_unclosed_list_falls_back_to_whole_page(self):
+        html = b'<ul class="trackList__list"><li><ul><li>a</li></ul></li>'
+        self.assertEqual(scrape_soundcloud._track_list_region(html, self.pattern), html)
+
+    def test_missing_list_falls_back_to_whole_page(self):
+        html = b'<ul class="other"><li><a href="/bob/t1">T1</a></li></ul>'
+        self.assertEqual(scrape_soundcloud._track_list_region(html, self.pattern), html)
+
+@unittest.skipIf(scrape_soundcloud.LexborHTMLParser is None, 'selectolax is not installed')
+class TrackTitleLinkTest(unittest.TestCase):
+    def test_href_before_class(self):
+        html = (b'<ul class="trackList__list"><li>'
+                b'<a href="/bob/t1?in=bob/sets/mix" class="trackItem__trackTitle">T1</a>'
+                b'</li></ul>')
+        tree = scrape_soundcloud._parse_tree(html)
+        self.assertEqual(scrape_soundcloud._track_title_links(html, tree), ['bob/t1'])
+
+class MaxTracksTest(unittest.TestCase):
+    def test_limit_stops_early(self):
+        tracks = scrape_soundcloud._parse_playlist(STUB_PLAYLIST, 'https://soundcloud.com/bob/sets/mix', 3)
+        self.assertEqual(len(tracks), 3)
+
+    def test_rejects_limits_below_one(self):
+        for max_tracks in (0, -1):
+            with self.assertRaises(ValueError):
+                scrape_soundcloud._parse_playlist(STUB_PLAYLIST, 'https://soundcloud.com/bob/sets/mix', max_tracks)
+
+    def test_setting_values(self):
+        self.assertEqual(scrape_soundcloud._max_tracks_value('25'), 25)
+        self.assertEqual(scrape_soundcloud._max_tracks_value('inf'), float('inf'))
+        for value in ('abc', '0', '-1'):
+            with self.assertRaises(ValueError):
+                scrape_soundcloud._max_tracks_value(value)
+
+class ScrapeCacheTest(unittest.TestCase):
+    url = 'https://soundcloud.com/bob/sets/mix'
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        cache_path = mock.patch.object(scrape_soundcloud, '_CACHE_PATH', os.path.join(cache_dir.name, 'cache.sqlite3'))
+        cache_path.start()
+        self.addCleanup(cache_path.stop)
+        self.requests = []
+
+    def _scrape(self, *responses):
+        """Scrape self.url once per response, returning the results"""
+        results = []
+        for response in responses:
+            def fetch(url, headers=None):
+                self.requests.append(headers)
+                return response
+            with mock.patch.object(scrape_soundcloud, '_fetch', fetch):
+                results.append(scrape_soundcloud.scrape_playlist(self.url))
+        return results
+
+    def test_not_modified_returns_cached_tracks(self):
+        fresh, cached = self._scrape((200, STUB_PLAYLIST, {'ETag': '"v1"'}), (304, b'', {}))
+        self.assertEqual(len(fresh), 4)
+        self.assertEqual(self.requests[1], {'If-None-Match': '"v1"'})
+        self.assertEqual(cached, fresh)
+
+    def test_result_without_validators_is_not_stored(self):
+        self._scrape((200, STUB_PLAYLIST, {}), (200, STUB_PLAYLIST, {}))
+        self.assertEqual(self.requests[1], {})
+
+    def test_error_result_is_not_stored(self):
+        error, _ = self._scrape((200, b'<html></html>', {'ETag': '"v1"'}), (200, STUB_PLAYLIST, {}))
+        self.assertEqual(error, {'error': 'No tracks found'})
+        self.assertEqual(self.requests[1], {})
+
+class BatchDedupTest(unittest.TestCase):
+    def test_shared_dedup_spans_urls(self):
+        urls = ['https://soundcloud.com/bob/sets/mix', 'https://soundcloud.com/bob/sets/mix-2']
+        fetch = lambda url, headers=None: (200, STUB_PLAYLIST, {})
+        with mock.patch.object(scrape_soundcloud, '_fetch', fetch), \
+                mock.patch.object(scrape_soundcloud, '_CACHE_PATH', ''), \
+                mock.patch.object(scrape_soundcloud, 'aiohttp', None):
+            separate = asyncio.run(scrape_soundcloud.scrape_many(urls, 'playlist'))
+            shared = asyncio.run(scrape_soundcloud.scrape_many(urls, 'playlist', dedup=scrape_soundcloud._Dedup()))
+        self.assertEqual([len(result) for result in separate], [4, 4])
+        # Only the first URL keeps the tracks both playlists share
+        self.assertEqual([len(result) for result in shared], [4, 0])
+
+    def test_cli_batch_keeps_tracks_for_repeated_url(self):
+        url = 'https://soundcloud.com/bob/sets/mix'
+        fetch = lambda url, headers=None: (200, STUB_PLAYLIST, {})
+        with mock.patch.object(scrape_soundcloud, '_fetch', fetch), \
+                mock.patch.object(scrape_soundcloud, '_CACHE_PATH', ''), \
+                mock.patch.object(scrape_soundcloud, 'aiohttp', None), \
+                mock.patch.object(scrape_soundcloud, '_BLOOM_DEDUP', True), \
+                mock.patch.object(scrape_soundcloud, '_print_json') as print_json, \
+                mock.patch.object(sys, 'argv', ['scrape_soundcloud.py', 'batch', 'playlist']), \
+                mock.patch.object(sys, 'stdin', io.StringIO(f'{url}\n{url}\n')):
+            scrape_soundcloud.main()
+        result = print_json.call_args[0][0]
+        self.assertEqual(list(result), [url])
+        self.assertEqual(len(result[url]), 4)
+
+if __name__ == '__main__':
+    unittest.main()